@@ -15,6 +15,7 @@ MAGIC_COOKIE = 0xABCDDCBA
 MSG_OFFER = 0x02
 MSG_REQUEST = 0x03
 MSG_PAYLOAD = 0x04
+MSG_EVENT = 0x05  # spectator feed (server -> spectators)
 
 # Result codes (server -> client)
 RESULT_NOT_OVER = 0x00
@@ -22,6 +23,16 @@ RESULT_TIE = 0x01
 RESULT_LOSS = 0x02
 RESULT_WIN = 0x03
 
+# Spectator event kinds
+EV_DEAL = 0x01         # initial deal, one event per visible card
+EV_HIT = 0x02          # player hit
+EV_DEALER_DRAW = 0x03  # dealer reveal or draw
+EV_RESULT = 0x04       # round finished
+
+# Who a card went to
+WHO_PLAYER = 0
+WHO_DEALER = 1
+
 UDP_OFFER_PORT_DEFAULT = 13122
 
 NAME_LEN = 32
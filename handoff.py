@@ -0,0 +1,105 @@
+"""Listening-socket handoff over a Unix socket (zero-downtime restart).
+
+The running server listens on a Unix socket. A replacement process connects,
+receives the listening fds via SCM_RIGHTS (the game TCP listener first, then
+the spectator feed listener if there is one), starts serving on them and then
+acknowledges with how many of them it adopted; a listener it declines stays
+with the old process until that exits. The old process then pauses its own accepting and answers the
+ack with a final confirmation; the new process only starts accepting after
+that, so the two never race in accept(). The old process keeps serving
+while the exchange is in flight, so there is never a moment without an
+acceptor or an offer broadcaster. If the exchange breaks at any step both
+sides see it fail: the old process keeps serving and the new one exits.
+"""
+
+from __future__ import annotations
+
+import os
+import socket
+
+from common import recv_exact
+from typing import Callable, List, Optional, Tuple
+
+HANDOFF_MSG = b"BJ-LISTEN"
+HANDOFF_ACK = b"BJ-READY"
+HANDOFF_DONE = b"BJ-DONE"
+MAX_HANDOFF_FDS = 2  # game listener, spectator listener
+
+def open_handoff_listener(path: str) -> socket.socket:
+    """Bind a Unix listener at path, replacing any stale socket file."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    us = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    us.bind(path)
+    us.listen(1)
+    return us
+
+def offer_listeners(
+    conn: socket.socket,
+    listeners: List[socket.socket],
+    quiesce: Callable[[int], bool],
+    timeout: float = 10.0,
+) -> int:
+    """Pass the listeners' fds, in order, to a successor connected on conn.
+
+    quiesce(adopted) is called once the successor has acked, with how many of
+    the listeners (a prefix of the list) it took; it must stop this process
+    accepting on those and return True, or False to abort the handoff.
+    Returns that count once the successor has been told to take over; 0 if it
+    disconnects, times out or quiesce() fails (the caller should keep serving).
+    """
+    try:
+        conn.settimeout(timeout)
+        socket.send_fds(conn, [HANDOFF_MSG], [ls.fileno() for ls in listeners])
+        ack = recv_exact(conn, len(HANDOFF_ACK) + 1)
+        adopted = ack[-1]
+        if ack[:-1] != HANDOFF_ACK or not 1 <= adopted <= len(listeners):
+            return 0
+        if not quiesce(adopted):
+            return 0
+        conn.sendall(HANDOFF_DONE)
+        return adopted
+    except OSError:
+        return 0
+    finally:
+        conn.close()
+
+def receive_listeners(path: str, timeout: float = 10.0) -> Tuple[List[socket.socket], socket.socket]:
+    """Connect to a running server at path and take its listeners.
+
+    Returns (listeners, control_conn); listeners[0] is the game TCP listener,
+    listeners[1] (if present) the spectator feed listener. Call
+    confirm_takeover(control_conn) once the new process is ready to accept
+    and broadcast.
+    """
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.settimeout(timeout)
+    try:
+        conn.connect(path)
+        msg, fds, _, _ = socket.recv_fds(conn, len(HANDOFF_MSG), MAX_HANDOFF_FDS)
+    except OSError:
+        conn.close()
+        raise
+    if msg != HANDOFF_MSG or not fds:
+        for fd in fds:
+            os.close(fd)
+        conn.close()
+        raise ConnectionError("bad handoff message")
+    listeners = [socket.socket(fileno=fd) for fd in fds]
+    listeners[0].setblocking(True)
+    return listeners, conn
+
+def confirm_takeover(conn: Optional[socket.socket], adopted: int = 1) -> bool:
+    """Tell the previous server we are ready, having kept the first `adopted`
+    listeners; False if it is no longer waiting."""
+    if conn is None:
+        return True
+    try:
+        conn.sendall(HANDOFF_ACK + bytes([adopted]))
+        return conn.recv(len(HANDOFF_DONE)) == HANDOFF_DONE
+    except OSError:
+        return False
+    finally:
+        conn.close()
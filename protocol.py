@@ -14,6 +14,7 @@ from common import (
     MSG_OFFER,
     MSG_REQUEST,
     MSG_PAYLOAD,
+    MSG_EVENT,
     NAME_LEN,
     clamp_name,
     unpad_name,
@@ -24,6 +25,9 @@ OFFER_SIZE = 4 + 1 + 2 + NAME_LEN      # 39
 REQUEST_SIZE = 4 + 1 + 1 + NAME_LEN    # 38
 C2S_PAYLOAD_SIZE = 4 + 1 + 5           # 10
 S2C_PAYLOAD_SIZE = 4 + 1 + 1 + 3       # 9
+EVENT_SIZE = 4 + 1 + 1 + 4 + 1 + 1 + 2 + 1 + 1 + 1  # 17
+
+_EVENT_FMT = struct.Struct("!IBBIBBHBBB")
 
 # Suit encoding: 0..3 = H,D,C,S
 SUITS = ("H", "D", "C", "S")
@@ -48,6 +52,19 @@ class ServerPayload:
     result: int  # 0..3
     card: CardWire
 
+@dataclass(frozen=True)
+class GameEvent:
+    kind: int     # EV_*
+    session: int
+    round: int
+    who: int      # WHO_PLAYER / WHO_DEALER
+    card: CardWire
+    total: int    # hand total of `who` after this card
+    result: int   # RESULT_* (NOT_OVER until EV_RESULT)
+    # EV_RESULT is always from the player's side: who=WHO_PLAYER, card is the
+    # player's last card and total their final hand (dealer cards and totals
+    # arrive earlier as EV_DEAL / EV_DEALER_DRAW).
+
 def pack_offer(tcp_port: int, server_name: str) -> bytes:
     return struct.pack("!IBH", MAGIC_COOKIE, MSG_OFFER, tcp_port) + clamp_name(server_name)
 
@@ -107,3 +124,16 @@ def unpack_server_payload(data: bytes) -> ServerPayload:
         raise ValueError("bad payload header")
     rank, suit = struct.unpack("!HB", data[6:9])
     return ServerPayload(result=result, card=CardWire(rank=rank, suit=suit))
+
+def pack_event(kind: int, session: int, rnd: int, who: int, rank: int, suit: int, total: int, result: int) -> bytes:
+    return _EVENT_FMT.pack(MAGIC_COOKIE, MSG_EVENT, kind, session & 0xFFFFFFFF, rnd, who,
+                           rank, suit, min(total, 255), result)
+
+def unpack_event(data: bytes) -> GameEvent:
+    if len(data) != EVENT_SIZE:
+        raise ValueError("bad event size")
+    cookie, mtype, kind, session, rnd, who, rank, suit, total, result = _EVENT_FMT.unpack(data)
+    if cookie != MAGIC_COOKIE or mtype != MSG_EVENT:
+        raise ValueError("bad event header")
+    return GameEvent(kind=kind, session=session, round=rnd, who=who,
+                     card=CardWire(rank=rank, suit=suit), total=total, result=result)
@@ -0,0 +1,232 @@
+"""Persistent session results store (SQLite, write-behind).
+
+Game threads call ``ResultsStore.record`` which only enqueues; a single
+writer thread drains the queue and commits in batches (by size or time),
+so no game thread ever touches the disk.
+
+Run as a script to query history:
+    python results.py --db results.db --player Alice
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import pathlib
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from common import log
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    client_name TEXT    NOT NULL,
+    client_addr TEXT    NOT NULL,
+    rounds      INTEGER NOT NULL,
+    wins        INTEGER NOT NULL,
+    losses      INTEGER NOT NULL,
+    ties        INTEGER NOT NULL,
+    started     REAL    NOT NULL,
+    finished    REAL    NOT NULL,
+    completed   INTEGER NOT NULL  -- 0 if the client left before all rounds
+);
+CREATE INDEX IF NOT EXISTS sessions_by_name ON sessions (client_name, finished);
+"""
+
+INSERT_SQL = (
+    "INSERT INTO sessions "
+    "(client_name, client_addr, rounds, wins, losses, ties, started, finished, completed) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+@dataclass(frozen=True)
+class SessionResult:
+    client_name: str
+    client_addr: str
+    rounds: int
+    wins: int
+    losses: int
+    ties: int
+    started: float
+    finished: float
+    completed: bool = True
+
+    def row(self) -> tuple:
+        return (
+            self.client_name,
+            self.client_addr,
+            self.rounds,
+            self.wins,
+            self.losses,
+            self.ties,
+            self.started,
+            self.finished,
+            int(self.completed),
+        )
+
+def open_db(path: str) -> sqlite3.Connection:
+    db = sqlite3.connect(path, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(SCHEMA)
+    return db
+
+def open_db_readonly(path: str) -> sqlite3.Connection:
+    """Open an existing results file for queries without modifying it."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"no results database at '{path}'")
+    uri = pathlib.Path(path).absolute().as_uri() + "?mode=ro"
+    return sqlite3.connect(uri, uri=True)
+
+class ResultsStore(threading.Thread):
+    """Write-behind writer: bounded queue in front of batched SQLite commits.
+
+    When the queue is full, ``record`` waits up to ``put_timeout`` seconds
+    (backpressure) and then drops the result rather than stall the game.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 512,
+        flush_interval: float = 0.5,
+        max_pending: int = 65536,
+        put_timeout: float = 0.05,
+    ) -> None:
+        super().__init__(daemon=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._q: "queue.Queue[Optional[SessionResult]]" = queue.Queue(maxsize=max_pending)
+        self._closing = threading.Event()
+        self.db = open_db(path)
+
+    def record(self, res: SessionResult) -> bool:
+        try:
+            self._q.put(res, timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+                n = self.dropped
+            if n == 1 or n % 1000 == 0:
+                log("SERVER", f"Results queue full, dropped {n} session result(s)")
+            return False
+
+    def run(self) -> None:
+        batch: List[tuple] = []
+        deadline = time.monotonic() + self.flush_interval
+        done = False
+        while not done:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                item = self._q.get(timeout=timeout)
+            except queue.Empty:
+                pass
+            else:
+                if item is None:
+                    # Sentinel from stop(): drain what is left and exit.
+                    done = True
+                    self._drain_into(batch)
+                else:
+                    batch.append(item.row())
+                    # Grab whatever else is already waiting without blocking.
+                    done = self._drain_into(batch, limit=self.batch_size)
+
+            now = time.monotonic()
+            if done or len(batch) >= self.batch_size or now >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = now + self.flush_interval
+        self.db.close()
+
+    def _drain_into(self, batch: List[tuple], limit: Optional[int] = None) -> bool:
+        """Move queued results into batch without blocking; True if the stop sentinel was seen."""
+        stopping = False
+        while limit is None or len(batch) < limit:
+            try:
+                item = self._q.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                stopping = True
+                limit = None  # drain everything that is left
+            else:
+                batch.append(item.row())
+        return stopping
+
+    def _flush(self, batch: List[tuple]) -> None:
+        if not batch:
+            return
+        try:
+            with self.db:
+                self.db.executemany(INSERT_SQL, batch)
+        except Exception as e:
+            log("SERVER", f"Results commit failed ({len(batch)} rows lost): {e}")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._closing.is_set():
+            return
+        self._closing.set()
+        # Blocking put is fine here: the writer is draining.
+        self._q.put(None)
+        self.join(timeout)
+
+def player_history(db: sqlite3.Connection, name: str, limit: int) -> List[SessionResult]:
+    cur = db.execute(
+        "SELECT client_name, client_addr, rounds, wins, losses, ties, started, finished, completed "
+        "FROM sessions WHERE client_name = ? ORDER BY finished DESC LIMIT ?",
+        (name, limit),
+    )
+    return [SessionResult(*row[:-1], completed=bool(row[-1])) for row in cur.fetchall()]
+
+def player_summary(db: sqlite3.Connection) -> List[tuple]:
+    cur = db.execute(
+        "SELECT client_name, COUNT(*), SUM(wins), SUM(losses), SUM(ties) "
+        "FROM sessions GROUP BY client_name ORDER BY SUM(wins) DESC"
+    )
+    return cur.fetchall()
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Query persisted blackjack session results")
+    ap.add_argument("--db", default="results.db", help="SQLite results file")
+    ap.add_argument("--player", default=None, help="show session history for this client name")
+    ap.add_argument("--limit", type=int, default=50, help="max sessions to show (with --player)")
+    args = ap.parse_args()
+
+    try:
+        db = open_db_readonly(args.db)
+    except (OSError, sqlite3.Error) as e:
+        ap.error(str(e))
+    try:
+        if args.player is None:
+            print(f"{'player':<32} {'sessions':>8} {'W':>6} {'L':>6} {'T':>6}")
+            for name, n, w, l, t in player_summary(db):
+                print(f"{name:<32} {n:>8} {w:>6} {l:>6} {t:>6}")
+            return
+
+        rows = player_history(db, args.player, args.limit)
+        if not rows:
+            print(f"No sessions recorded for '{args.player}'")
+            return
+        for r in rows:
+            when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(r.finished))
+            dur = r.finished - r.started
+            print(
+                f"{when}  {r.client_addr:<21} rounds={r.rounds:<3} "
+                f"W/L/T = {r.wins}/{r.losses}/{r.ties}  ({dur:.2f}s)"
+                f"{'' if r.completed else '  [aborted]'}"
+            )
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
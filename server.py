@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 import argparse
+import os
+import select
+import signal
 import socket
 import threading
 import time
-from typing import Tuple
+from typing import List, Optional, Tuple
 
 from common import (
     UDP_OFFER_PORT_DEFAULT,
@@ -15,6 +18,12 @@ from common import (
     RESULT_TIE,
     RESULT_LOSS,
     RESULT_WIN,
+    EV_DEAL,
+    EV_HIT,
+    EV_DEALER_DRAW,
+    EV_RESULT,
+    WHO_PLAYER,
+    WHO_DEALER,
 )
 from protocol import (
     OFFER_SIZE,
@@ -25,8 +34,17 @@ from protocol import (
     unpack_request,
     unpack_client_payload,
     pack_server_payload,
+    pack_event,
 )
 from cards import Deck, Card, hand_total
+from results import ResultsStore, SessionResult
+from spectator import SpectatorFeed, SPECTATOR_PORT_DEFAULT, parse_hostport
+from handoff import (
+    open_handoff_listener,
+    offer_listeners,
+    receive_listeners,
+    confirm_takeover,
+)
 
 def pick_bind_ip() -> str:
     """Best-effort local IP detection for pretty printing."""
@@ -65,6 +83,85 @@ class OfferBroadcaster(threading.Thread):
         self._stop.set()
         safe_close(self.sock)
 
+class HandoffWorker(threading.Thread):
+    """Serves --handoff-socket off the accept loop.
+
+    The fd exchange (and a slow or silent successor) runs here, so the main
+    thread keeps accepting game clients. Once the successor has acked, the
+    worker asks the main loop to pause (pause_requested -> paused), stops
+    the spectator feed accepting, confirms the handoff, and publishes the
+    outcome via handed_off / settled.
+    """
+
+    def __init__(self, handoff: socket.socket, tcp: socket.socket, feed: Optional[SpectatorFeed]) -> None:
+        super().__init__(daemon=True)
+        self.handoff = handoff
+        self.tcp = tcp
+        self.feed = feed
+        self.handed_off = threading.Event()
+        self.pause_requested = threading.Event()
+        self.paused = threading.Event()
+        self.settled = threading.Event()
+        self._feed_paused = False
+        self.wake_r, self._wake_w = socket.socketpair()
+        self.wake_r.setblocking(False)
+
+    def run(self) -> None:
+        while True:
+            try:
+                conn, _ = self.handoff.accept()
+            except OSError:
+                return  # handoff socket closed on shutdown
+            listeners = [self.tcp]
+            if self.feed is not None and self.feed.listener is not None:
+                listeners.append(self.feed.listener)
+            self.settled.clear()
+            self._feed_paused = False
+            adopted = 0
+            try:
+                adopted = offer_listeners(conn, listeners, self._quiesce)
+            finally:
+                ok = adopted > 0
+                if self._feed_paused:
+                    if adopted > 1:
+                        self.feed.release_listener()
+                    else:
+                        self.feed.resume_accept()
+                if ok:
+                    self.handed_off.set()
+                self.pause_requested.clear()
+                self.settled.set()
+                self._wake()
+            if ok:
+                if len(listeners) > adopted:
+                    log("SERVER", "Successor declined the spectator listener, serving it until exit")
+                return
+            log("SERVER", "Listener handoff failed, continuing to serve")
+
+    def _quiesce(self, adopted: int) -> bool:
+        self.paused.clear()
+        self.pause_requested.set()
+        self._wake()
+        if not self.paused.wait(5.0):
+            return False
+        if adopted > 1 and self.feed is not None:
+            self.feed.pause_accept()
+            self._feed_paused = True
+        return True
+
+    def _wake(self) -> None:
+        try:
+            self._wake_w.send(b"\x00")
+        except OSError:
+            pass
+
+    def drain_wake(self) -> None:
+        try:
+            while self.wake_r.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
 def decide_winner(player_total: int, dealer_total: int, player_bust: bool, dealer_bust: bool) -> int:
     if player_bust:
         return RESULT_LOSS
@@ -80,9 +177,23 @@ def send_card(conn: socket.socket, result: int, card: Card) -> None:
     msg = pack_server_payload(result, card.rank, card.suit)
     conn.sendall(msg)
 
-def handle_client(conn: socket.socket, addr: Tuple[str, int]) -> None:
+def handle_client(
+    conn: socket.socket,
+    addr: Tuple[str, int],
+    store: Optional[ResultsStore] = None,
+    feed: Optional[SpectatorFeed] = None,
+) -> None:
     ip, port = addr
     prefix = f"CLIENT {ip}:{port}"
+    started = time.time()
+    req = None
+    completed = False
+    wins = losses = ties = 0
+    session = feed.new_session() if feed is not None else 0
+
+    def emit(kind: int, r: int, who: int, card: Card, total: int, result: int = RESULT_NOT_OVER) -> None:
+        if feed is not None:
+            feed.publish(pack_event(kind, session, r, who, card.rank, card.suit, total, result))
 
     try:
         conn.settimeout(10.0)
@@ -91,8 +202,6 @@ def handle_client(conn: socket.socket, addr: Tuple[str, int]) -> None:
         rounds = req.rounds
         log("SERVER", f"{prefix} connected as '{req.client_name}', requested {rounds} rounds")
 
-        wins = losses = ties = 0
-
         for r in range(1, rounds + 1):
             deck = Deck()  # fresh deck each round
             player = [deck.draw(), deck.draw()]
@@ -104,6 +213,9 @@ def handle_client(conn: socket.socket, addr: Tuple[str, int]) -> None:
             send_card(conn, RESULT_NOT_OVER, player[0])
             send_card(conn, RESULT_NOT_OVER, player[1])
             send_card(conn, RESULT_NOT_OVER, dealer[0])
+            emit(EV_DEAL, r, WHO_PLAYER, player[0], player[0].value())
+            emit(EV_DEAL, r, WHO_PLAYER, player[1], hand_total(player))
+            emit(EV_DEAL, r, WHO_DEALER, dealer[0], dealer[0].value())
 
             # Player turn
             while True:
@@ -125,6 +237,7 @@ def handle_client(conn: socket.socket, addr: Tuple[str, int]) -> None:
                     player.append(c)
                     pt = hand_total(player)
                     log("SERVER", f"{prefix} player HIT -> {c.short()} (total {pt})")
+                    emit(EV_HIT, r, WHO_PLAYER, c, pt)
                     # If bust, send final immediately with loss; else not-over
                     if pt > 21:
                         player_bust = True
@@ -143,12 +256,14 @@ def handle_client(conn: socket.socket, addr: Tuple[str, int]) -> None:
 
             if player_bust:
                 losses += 1
+                emit(EV_RESULT, r, WHO_PLAYER, player[-1], hand_total(player), RESULT_LOSS)
                 continue
 
             # Dealer turn: reveal hidden card first
             send_card(conn, RESULT_NOT_OVER, dealer[1])
             dt = hand_total(dealer)
             log("SERVER", f"{prefix} dealer reveals {dealer[1].short()} (total {dt})")
+            emit(EV_DEALER_DRAW, r, WHO_DEALER, dealer[1], dt)
 
             last_dealer_card = dealer[1]
 
@@ -158,6 +273,7 @@ def handle_client(conn: socket.socket, addr: Tuple[str, int]) -> None:
                 last_dealer_card = c
                 dt = hand_total(dealer)
                 log("SERVER", f"{prefix} dealer HIT -> {c.short()} (total {dt})")
+                emit(EV_DEALER_DRAW, r, WHO_DEALER, c, dt)
                 if dt > 21:
                     dealer_bust = True
                     break
@@ -176,14 +292,60 @@ def handle_client(conn: socket.socket, addr: Tuple[str, int]) -> None:
             # Final result message: include last relevant dealer card (or dealer[0] if no draws)
             final_card = last_dealer_card if dealer else dealer[0]
             send_card(conn, result, final_card)
+            emit(EV_RESULT, r, WHO_PLAYER, player[-1], pt, result)
             log("SERVER", f"{prefix} Round {r} result: player {pt}, dealer {dt} -> {result}")
 
         log("SERVER", f"{prefix} finished: W/L/T = {wins}/{losses}/{ties}")
+        completed = True
     except Exception as e:
         log("SERVER", f"{prefix} error: {e}")
     finally:
         safe_close(conn)
         log("SERVER", f"{prefix} disconnected")
+        # Aborted sessions (disconnect, timeout, bad message) are kept too,
+        # with the score reached so far.
+        if store is not None and req is not None:
+            store.record(SessionResult(
+                client_name=req.client_name,
+                client_addr=f"{ip}:{port}",
+                rounds=req.rounds,
+                wins=wins,
+                losses=losses,
+                ties=ties,
+                started=started,
+                finished=time.time(),
+                completed=completed,
+            ))
+
+def listener_matches(ls: socket.socket, host: str, port: int) -> bool:
+    """True if ls is bound to host:port (port 0 matches any port)."""
+    bound_host, bound_port = ls.getsockname()[:2]
+    if port and port != bound_port:
+        return False
+    try:
+        want = socket.gethostbyname(host) if host else "0.0.0.0"
+    except OSError:
+        return False
+    return want == bound_host
+
+def drain_sessions(sessions: List[Tuple[threading.Thread, socket.socket]], deadline: float) -> int:
+    """Wait for active sessions until deadline, then cut off the rest.
+
+    Cut-off sessions are shut down (not abandoned) so handle_client still
+    records their partial results. Returns how many had to be cut off.
+    """
+    end = time.monotonic() + deadline
+    for t, _ in sessions:
+        t.join(max(0.0, end - time.monotonic()))
+    left = [(t, conn) for t, conn in sessions if t.is_alive()]
+    for _, conn in left:
+        try:
+            conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    for t, _ in left:
+        t.join(1.0)
+    return len(left)
 
 def main() -> None:
     ap = argparse.ArgumentParser(description="Blackjack hackathon server (UDP offers + TCP game)")
@@ -191,32 +353,160 @@ def main() -> None:
     ap.add_argument("--tcp-port", type=int, default=0, help="TCP listen port (0 = auto)")
     ap.add_argument("--udp-port", type=int, default=UDP_OFFER_PORT_DEFAULT, help="UDP offer port (default 13122)")
     ap.add_argument("--offer-interval", type=float, default=1.0, help="seconds between UDP offers")
+    ap.add_argument("--results-db", default=None, help="SQLite file to persist session results (off if unset)")
+    ap.add_argument("--handoff-socket", default=None,
+                    help="Unix socket path for zero-downtime restarts (a new server started with "
+                         "--takeover connects here and inherits the TCP listener)")
+    ap.add_argument("--takeover", action="store_true",
+                    help="inherit the TCP listener from the server running on --handoff-socket")
+    ap.add_argument("--drain-timeout", type=float, default=60.0,
+                    help="seconds to let active sessions finish after handing off the listener")
+    ap.add_argument("--spectator-port", type=int, default=None,
+                    help=f"serve the live spectator feed on this local TCP port (e.g. {SPECTATOR_PORT_DEFAULT}; off if unset)")
+    ap.add_argument("--spectator-bind", default="127.0.0.1", help="address the spectator feed listens on")
+    ap.add_argument("--spectator-mcast", default=None,
+                    help="also publish spectator events to this UDP multicast group:port")
     args = ap.parse_args()
+    if args.takeover and not args.handoff_socket:
+        ap.error("--takeover requires --handoff-socket")
 
-    # TCP listen socket
-    tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    tcp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    tcp.bind(("", args.tcp_port))
-    tcp.listen()
+    # TCP listen socket: inherited from the previous server, or freshly bound
+    control: Optional[socket.socket] = None
+    spectator_ls: Optional[socket.socket] = None
+    if args.takeover:
+        try:
+            inherited, control = receive_listeners(args.handoff_socket)
+        except OSError as e:
+            ap.error(f"cannot take over from server on {args.handoff_socket}: {e}")
+        tcp = inherited[0]
+        if len(inherited) > 1:
+            spectator_ls = inherited[1]
+            # Decline it (the old server keeps serving it until it exits) unless
+            # it is the feed address we were asked to serve.
+            if args.spectator_port is None:
+                spectator_ls.close()
+                spectator_ls = None
+            elif not listener_matches(spectator_ls, args.spectator_bind, args.spectator_port):
+                host, port = spectator_ls.getsockname()[:2]
+                log("SERVER", f"Inherited spectator listener {host}:{port} differs from "
+                              f"--spectator-bind/--spectator-port, binding a new one")
+                spectator_ls.close()
+                spectator_ls = None
+    else:
+        tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        tcp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        tcp.bind(("", args.tcp_port))
+        tcp.listen()
     tcp_port = tcp.getsockname()[1]
 
     ip = pick_bind_ip()
-    log("SERVER", f"Server started, listening on IP address {ip}, TCP port {tcp_port}")
+    how = "took over listener" if args.takeover else "listening"
+    log("SERVER", f"Server started, {how} on IP address {ip}, TCP port {tcp_port}")
 
     broadcaster = OfferBroadcaster(args.name, tcp_port, args.udp_port, args.offer_interval)
     broadcaster.start()
     log("SERVER", f"Broadcasting offers on UDP {args.udp_port} every {args.offer_interval:.1f}s")
 
+    store: Optional[ResultsStore] = None
+    if args.results_db:
+        store = ResultsStore(args.results_db)
+        store.start()
+        log("SERVER", f"Persisting session results to {args.results_db}")
+
+    feed: Optional[SpectatorFeed] = None
+    if args.spectator_port is not None or args.spectator_mcast:
+        mcast = parse_hostport(args.spectator_mcast) if args.spectator_mcast else None
+        feed = SpectatorFeed(args.spectator_port, args.spectator_bind, mcast, listener=spectator_ls)
+        if spectator_ls is not None:
+            feed.pause_accept()  # the old server still owns it until the handoff is confirmed
+        feed.start()
+        where = []
+        if feed.listener is not None:
+            host, port = feed.listener.getsockname()[:2]
+            where.append(f"TCP {host}:{port}" + (" (inherited)" if spectator_ls is not None else ""))
+        if mcast is not None:
+            where.append(f"multicast {args.spectator_mcast}")
+        log("SERVER", f"Spectator feed on {', '.join(where)}")
+
+    # We are ready and broadcasting: once the previous server confirms it has
+    # stopped accepting, take over accepting and claim the handoff path.
+    if not confirm_takeover(control, 2 if spectator_ls is not None else 1):
+        # The old server timed out waiting for us and kept the listener, so it is
+        # still serving. Step aside rather than run two servers on one port.
+        log("SERVER", "Previous server did not accept the takeover, exiting")
+        broadcaster.stop()
+        tcp.close()  # shared fd: no shutdown()
+        if store is not None:
+            store.stop()
+        if feed is not None:
+            feed.stop()
+        return
+    if feed is not None and spectator_ls is not None:
+        feed.resume_accept()
+    handoff: Optional[socket.socket] = None
+    worker: Optional[HandoffWorker] = None
+    if args.handoff_socket:
+        handoff = open_handoff_listener(args.handoff_socket)
+        worker = HandoffWorker(handoff, tcp, feed)
+        worker.start()
+        log("SERVER", f"Accepting listener handoff on {args.handoff_socket}")
+
+    sessions: List[Tuple[threading.Thread, socket.socket]] = []
+    handed_off = False
+    watch = [tcp] if worker is None else [tcp, worker.wake_r]
+    # SIGTERM (service stop, kill) takes the same path as Ctrl-C so the results
+    # store and spectator feed are flushed before exit.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
     try:
-        while True:
-            conn, addr = tcp.accept()
-            t = threading.Thread(target=handle_client, args=(conn, addr), daemon=True)
-            t.start()
+        while not handed_off:
+            ready, _, _ = select.select(watch, [], [])
+            if worker is not None and worker.wake_r in ready:
+                worker.drain_wake()
+                if worker.pause_requested.is_set():
+                    # The successor has acked: stop accepting until the
+                    # handoff is confirmed or called off.
+                    worker.paused.set()
+                    worker.settled.wait()
+                handed_off = worker.handed_off.is_set()
+                if handed_off:
+                    log("SERVER", "Listener handed off, no longer accepting new clients")
+                    break
+                continue
+            if tcp in ready:
+                conn, addr = tcp.accept()
+                t = threading.Thread(target=handle_client, args=(conn, addr, store, feed), daemon=True)
+                t.start()
+                sessions = [(s, c) for s, c in sessions if s.is_alive()]
+                sessions.append((t, conn))
     except KeyboardInterrupt:
         log("SERVER", "Shutting down...")
     finally:
+        # Shutdown and draining are bounded by their own deadlines; a repeated
+        # SIGTERM must not cut them short and lose queued results.
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
         broadcaster.stop()
-        safe_close(tcp)
+        if handed_off:
+            # The successor shares this listener: close our fd only, no shutdown().
+            tcp.close()
+            handoff.close()
+            active = sum(1 for s, _ in sessions if s.is_alive())
+            log("SERVER", f"Draining {active} active session(s) (up to {args.drain_timeout:.0f}s)")
+            left = drain_sessions(sessions, args.drain_timeout)
+            if left:
+                log("SERVER", f"Drain deadline reached, cut off {left} session(s)")
+        else:
+            safe_close(tcp)
+            if handoff is not None:
+                handoff.close()
+                try:
+                    os.unlink(args.handoff_socket)
+                except OSError:
+                    pass
+        if store is not None:
+            store.stop()
+        if feed is not None:
+            feed.stop()
+        log("SERVER", "Exited")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,348 @@
+"""Live spectator feed: fixed-size binary game events fanned out to watchers.
+
+Game threads call ``SpectatorFeed.publish`` which only appends the packed
+event to a bounded deque and pokes a non-blocking wake socket. The feed
+thread drains it, joins the pending events into one bytes object and hands
+that same object to every subscriber (TCP) and/or sends it once to a
+multicast group. A subscriber whose unsent backlog would exceed
+``max_backlog`` bytes is dropped, so slow spectators never back-pressure
+the game.
+
+Run as a script to watch a feed:
+    python spectator.py --connect 127.0.0.1:13123
+"""
+
+from __future__ import annotations
+
+import argparse
+import collections
+import itertools
+import random
+import selectors
+import socket
+import threading
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from common import (
+    log,
+    recv_exact,
+    safe_close,
+    EV_DEAL,
+    EV_HIT,
+    EV_DEALER_DRAW,
+    EV_RESULT,
+    WHO_PLAYER,
+)
+from protocol import EVENT_SIZE, unpack_event
+from cards import Card
+
+SPECTATOR_PORT_DEFAULT = 13123
+
+EVENT_NAMES = {
+    EV_DEAL: "DEAL",
+    EV_HIT: "HIT",
+    EV_DEALER_DRAW: "DEALER",
+    EV_RESULT: "RESULT",
+}
+
+class _Subscriber:
+    __slots__ = ("sock", "addr", "out", "backlog", "offset", "want_write")
+
+    def __init__(self, sock: socket.socket, addr: Tuple[str, int]) -> None:
+        self.sock = sock
+        self.addr = addr
+        self.out: Deque[memoryview] = collections.deque()
+        self.backlog = 0  # unsent bytes across out
+        self.offset = 0   # bytes of out[0] already sent
+        self.want_write = False  # EVENT_WRITE currently registered
+
+class SpectatorFeed(threading.Thread):
+    def __init__(
+        self,
+        tcp_port: Optional[int] = SPECTATOR_PORT_DEFAULT,
+        bind_ip: str = "127.0.0.1",
+        mcast: Optional[Tuple[str, int]] = None,
+        max_pending: int = 65536,
+        max_backlog: int = 256 * 1024,
+        listener: Optional[socket.socket] = None,
+    ) -> None:
+        super().__init__(daemon=True)
+        self.max_backlog = max_backlog
+        self.mcast = mcast
+        self._pending: Deque[bytes] = collections.deque(maxlen=max_pending)
+        # Random 32-bit base so sessions from a --takeover successor don't
+        # collide with the ones its predecessor is still draining.
+        self._ids = itertools.count(random.getrandbits(32))
+        self._closing = threading.Event()
+        self._calls: Deque[Tuple[Callable[[], None], threading.Event]] = collections.deque()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._subs: Dict[int, _Subscriber] = {}
+        self._sel = selectors.DefaultSelector()
+        self._sel.register(self._wake_r, selectors.EVENT_READ)
+
+        # listener, if given, was inherited from a previous server (see handoff.py).
+        if listener is None and tcp_port is not None:
+            listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            listener.bind((bind_ip, tcp_port))
+            listener.listen()
+        self.listener = listener
+        self._accepting = False
+        if listener is not None:
+            listener.setblocking(False)
+            self._sel.register(listener, selectors.EVENT_READ)
+            self._accepting = True
+
+        self.mcast_sock: Optional[socket.socket] = None
+        if mcast is not None:
+            ms = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            ms.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+            ms.setblocking(False)
+            self.mcast_sock = ms
+
+    @property
+    def port(self) -> Optional[int]:
+        return self.listener.getsockname()[1] if self.listener else None
+
+    def new_session(self) -> int:
+        return next(self._ids) & 0xFFFFFFFF
+
+    def publish(self, event: bytes) -> None:
+        """Queue one packed event; never blocks (oldest events drop when full)."""
+        self._pending.append(event)
+        self._wake()
+
+    def pause_accept(self) -> None:
+        """Stop taking new subscribers; pending connects wait in the backlog."""
+        self._call_in_loop(self._unregister_listener)
+
+    def resume_accept(self) -> None:
+        self._call_in_loop(self._register_listener)
+
+    def release_listener(self) -> None:
+        """Give up the listener after handing it to a successor.
+
+        Only our fd is closed (no shutdown()), so the successor keeps accepting
+        on it; existing subscribers stay until stop().
+        """
+        def release() -> None:
+            self._unregister_listener()
+            if self.listener is not None:
+                self.listener.close()
+                self.listener = None
+        self._call_in_loop(release)
+
+    def _register_listener(self) -> None:
+        if self.listener is not None and not self._accepting:
+            self._sel.register(self.listener, selectors.EVENT_READ)
+            self._accepting = True
+
+    def _unregister_listener(self) -> None:
+        if self.listener is not None and self._accepting:
+            self._sel.unregister(self.listener)
+            self._accepting = False
+
+    def _call_in_loop(self, fn: Callable[[], None]) -> None:
+        # The selector belongs to the feed thread; run fn there and wait for it.
+        if not self.is_alive():
+            fn()
+            return
+        done = threading.Event()
+        self._calls.append((fn, done))
+        self._wake()
+        done.wait(2.0)
+
+    def _wake(self) -> None:
+        try:
+            self._wake_w.send(b"\x00")
+        except OSError:
+            pass  # wake buffer full: the feed thread is already due to run
+
+    def run(self) -> None:
+        while not self._closing.is_set():
+            for key, mask in self._sel.select():
+                sock = key.fileobj
+                if sock is self._wake_r:
+                    self._drain_wake()
+                elif sock is self.listener:
+                    self._accept()
+                else:
+                    sub = self._subs.get(key.fd)
+                    if sub is not None:
+                        if mask & selectors.EVENT_READ:
+                            self._check_closed(sub)
+                        if key.fd in self._subs and mask & selectors.EVENT_WRITE:
+                            self._flush(sub)
+            while self._calls:
+                fn, done = self._calls.popleft()
+                fn()
+                done.set()
+            self._fan_out()
+        for sub in list(self._subs.values()):
+            self._drop(sub, None)
+        self._sel.close()
+        while self._calls:
+            fn, done = self._calls.popleft()
+            done.set()
+        if self.listener is not None:
+            # Plain close: the listener may be shared with a successor process.
+            self.listener.close()
+        if self.mcast_sock is not None:
+            self.mcast_sock.close()
+
+    def _drain_wake(self) -> None:
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                conn, addr = self.listener.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            conn.setblocking(False)
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sub = _Subscriber(conn, addr)
+            self._subs[conn.fileno()] = sub
+            self._sel.register(conn, selectors.EVENT_READ)
+            log("SPECTATOR", f"{addr[0]}:{addr[1]} subscribed ({len(self._subs)} watching)")
+
+    def _fan_out(self) -> None:
+        if not self._pending:
+            return
+        events: List[bytes] = []
+        pending = self._pending
+        while pending:
+            events.append(pending.popleft())
+        blob = b"".join(events)  # encoded once, shared by every subscriber
+
+        if self.mcast_sock is not None:
+            # Keep datagrams well under a typical MTU, on event boundaries.
+            step = (1400 // EVENT_SIZE) * EVENT_SIZE
+            for i in range(0, len(blob), step):
+                try:
+                    self.mcast_sock.sendto(blob[i:i + step], self.mcast)
+                except OSError:
+                    break
+
+        # Hand out a large burst in pieces no bigger than max_backlog, so a
+        # subscriber is only dropped for backlog it already had, never because
+        # the burst alone is big.
+        step = max(EVENT_SIZE, (self.max_backlog // EVENT_SIZE) * EVENT_SIZE)
+        view = memoryview(blob)
+        for i in range(0, len(blob), step):
+            chunk = view[i:i + step]
+            for sub in list(self._subs.values()):
+                if sub.backlog and sub.backlog + len(chunk) > self.max_backlog:
+                    self._drop(sub, "too slow")
+                    continue
+                was_idle = not sub.out
+                sub.out.append(chunk)
+                sub.backlog += len(chunk)
+                if was_idle:
+                    self._flush(sub)
+
+    def _flush(self, sub: _Subscriber) -> None:
+        while sub.out:
+            chunk = sub.out[0]
+            try:
+                n = sub.sock.send(chunk[sub.offset:])
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                self._drop(sub, "send failed")
+                return
+            sub.offset += n
+            sub.backlog -= n
+            if sub.offset < len(chunk):
+                break
+            sub.out.popleft()
+            sub.offset = 0
+        want_write = bool(sub.out)
+        if want_write != sub.want_write:
+            # Only touch the selector when write interest flips.
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if want_write else 0)
+            self._sel.modify(sub.sock, events)
+            sub.want_write = want_write
+
+    def _check_closed(self, sub: _Subscriber) -> None:
+        try:
+            data = sub.sock.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._drop(sub, "disconnected")
+        # Spectators have nothing to say; anything they send is ignored.
+
+    def _drop(self, sub: _Subscriber, why: Optional[str]) -> None:
+        self._subs.pop(sub.sock.fileno(), None)
+        try:
+            self._sel.unregister(sub.sock)
+        except (KeyError, ValueError):
+            pass
+        safe_close(sub.sock)
+        if why:
+            log("SPECTATOR", f"{sub.addr[0]}:{sub.addr[1]} dropped: {why}")
+
+    def stop(self, timeout: float = 2.0) -> None:
+        if self._closing.is_set():
+            return
+        self._closing.set()
+        self._wake()
+        self.join(timeout)
+
+def format_event(data: bytes) -> str:
+    ev = unpack_event(data)
+    head = f"#{ev.session} r{ev.round} {EVENT_NAMES.get(ev.kind, ev.kind)}"
+    if ev.kind == EV_RESULT:
+        return f"{head} result={ev.result}"
+    who = "player" if ev.who == WHO_PLAYER else "dealer"
+    card = Card(rank=ev.card.rank, suit=ev.card.suit)
+    return f"{head} {who} {card.short()} (total {ev.total})"
+
+def parse_hostport(s: str) -> Tuple[str, int]:
+    host, _, port = s.rpartition(":")
+    return host, int(port)
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Watch a blackjack server's spectator feed")
+    ap.add_argument("--connect", default=f"127.0.0.1:{SPECTATOR_PORT_DEFAULT}", help="feed TCP host:port")
+    ap.add_argument("--mcast", default=None, help="join multicast group:port instead of TCP")
+    args = ap.parse_args()
+
+    if args.mcast:
+        group, port = parse_hostport(args.mcast)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(("", port))
+        mreq = socket.inet_aton(group) + socket.inet_aton("0.0.0.0")
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+        try:
+            while True:
+                data, _ = sock.recvfrom(65536)
+                for i in range(0, len(data) - EVENT_SIZE + 1, EVENT_SIZE):
+                    print(format_event(data[i:i + EVENT_SIZE]), flush=True)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sock.close()
+        return
+
+    sock = socket.create_connection(parse_hostport(args.connect))
+    try:
+        while True:
+            print(format_event(recv_exact(sock, EVENT_SIZE)), flush=True)
+    except (KeyboardInterrupt, ConnectionError):
+        pass
+    finally:
+        safe_close(sock)
+
+if __name__ == "__main__":
+    main()